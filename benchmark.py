@@ -0,0 +1,70 @@
+# Copyright 2019 Telharmonium. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+import argparse
+import random
+import time
+import timeit
+from dicecalc import calc, rng, tokenizer, validate
+
+parser = argparse.ArgumentParser()
+parser.add_argument('-n', type=int, dest="n", default=300000, help="Number of dice to roll per backend and pool size.")
+parser.add_argument('-s', type=int, dest="s", default=20, help="Number of sides on each die.")
+parser.add_argument('-b', type=int, dest="b", nargs='+', default=[1, 3, 10, 100], help="Numbers of dice per rolls() call.")
+parser.add_argument('-e', dest="e", default='3d6+d20', help="Expression to time calc() with.")
+parser.add_argument('-v', dest="v", nargs='+', default=['2d20', '2D20 + 3(4) - d6', '3 * 4((4 - 2) * 3)^2 + 2d6', '(1 - 3) + (2 * 4 / 2', '((2d6 + 3) * 2 - d4) * (3d8 + 4) / 2'], help="Expressions to time validate() against calc() with.")
+
+args = parser.parse_args()
+
+# The per-die random.randint() loop tdop.roll() used before rng existed.
+class RandintBackend(object):
+	def rolls(self, quantity, sides):
+		return [random.randint(1, sides) for die in range(quantity)]
+
+backends = [
+	('randint', RandintBackend()),
+	('fast', rng.FastBackend()),
+	('secure', rng.SecureBackend())
+]
+try:
+	backends.append(('numpy', rng.NumpyBackend()))
+except ImportError:
+	pass
+
+# Dice per second for each backend at each pool size.
+print '%-8s' % 'pool' + ''.join(['%12s' % name for name, backend in backends])
+for batch in args.b:
+	line = '%-8d' % batch
+	for name, backend in backends:
+		calls = max(1, args.n // batch)
+		start = time.time()
+		for call in range(calls):
+			backend.rolls(batch, args.s)
+		elapsed = time.time() - start
+		line += '%12d' % (calls * batch / elapsed)
+	print line
+
+# Whole expressions per second through calc(), which is what callers see.
+print
+print 'calc(%r) per second' % args.e
+calls = max(1, args.n // 10)
+for name, backend in backends:
+	start = time.time()
+	for call in range(calls):
+		calc(args.e, backend)
+	elapsed = time.time() - start
+	print '%-8s %12d' % (name, calls / elapsed)
+
+# validate() is meant to run on every keystroke, so it needs to manage tens
+# of thousands of calls per second.  Its cost grows with the number of
+# tokens, so that's shown too.  The best of several runs is reported, since
+# timing noise only ever makes a run slower.
+print
+print '%-40s%8s%12s%12s' % ('calls per second', 'tokens', 'validate', 'calc')
+for expr in args.v:
+	line = '%-40s%8d' % (expr, len(tokenizer.tokenize(expr)['tokenList']))
+	for function in (validate, calc):
+		best = min(timeit.repeat(lambda: function(expr), number=2000, repeat=15))
+		line += '%12d' % (2000 / best)
+	print line
@@ -2,14 +2,24 @@
 # Use of this source code is governed by a BSD-style
 # license that can be found in the LICENSE file.
 
-from dicecalc import tdop, tokenizer
+from dicecalc import rng, tdop, tokenizer, validator
 
-# __all__ = ["tdop", "tokenizer"]
+# __all__ = ["rng", "tdop", "tokenizer", "validator"]
 
 """An example of usage:
 	from dicecalc import calc
 	rollResult = calc('2d20')
+
+Or, to roll with the operating system's entropy source:
+	rollResult = calc('2d20', rng.SecureBackend())
+
+To check an expression without rolling anything:
+	validation = validate('2D20 + 3(4)')
+	validation['canonical'] # '2d20+3*(4)'
 """
 
-def calc(expression):
-	return  tdop.parse(tokenizer.tokenize(expression))
\ No newline at end of file
+def calc(expression, backend=None):
+	return  tdop.parse(tokenizer.tokenize(expression), backend)
+
+def validate(expression):
+	return validator.validate(expression)
\ No newline at end of file
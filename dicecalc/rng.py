@@ -0,0 +1,192 @@
+# Copyright 2019 Telharmonium. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+import array
+import binascii
+import os
+import random
+import threading
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+# Generator, and default_rng() to make one, arrived in NumPy 1.17.  Older
+# versions, including every version that runs on Python 2, count as missing.
+if numpy is not None and not hasattr(numpy.random, 'default_rng'):
+    numpy = None
+
+# NOTE:
+# Every backend exposes rolls(quantity, sides), which returns a list of
+# quantity ints, each between 1 and sides inclusive.  tdop.roll() draws all
+# of its dice through whichever backend is active, so swapping backends
+# never changes the shape of a parse result.
+
+# Map an item width in bytes to an array typecode of exactly that width.
+# 'Q' doesn't exist before Python 3.3, so on Python 2 the 8 byte slot is
+# usually filled by 'L' instead.
+_typecodes = {}
+for _code in 'BHILQ':
+    try:
+        _size = array.array(_code).itemsize
+    except ValueError:
+        continue
+    _typecodes.setdefault(_size, _code)
+_widths = sorted(_typecodes)
+
+def rollsFromBytes(quantity, sides, takeBytes, fallbackRoll):
+    """Turns random bytes into quantity rolls of a die with sides sides.
+    takeBytes(numBytes) must return numBytes random bytes, and
+    fallbackRoll(sides) is used for dice too large for any array typecode.
+
+    Each die reads the narrowest unsigned int that can hold the number of
+    sides.  Values at or above the largest multiple of sides that fits in
+    that width are thrown away and redrawn, so every face is equally likely
+    regardless of the number of sides."""
+    if sides == 1:
+        return [1] * quantity
+    width = None
+    for w in _widths:
+        if sides <= 256 ** w:
+            width = w
+            break
+    if width is None:
+        return [fallbackRoll(sides) for die in range(quantity)]
+    typecode = _typecodes[width]
+    # Largest multiple of sides that fits in width bytes.
+    limit = (256 ** width // sides) * sides
+    result = []
+    while len(result) < quantity:
+        values = array.array(typecode, takeBytes((quantity - len(result)) * width))
+        result.extend([v % sides + 1 for v in values if v < limit])
+    if width > 2:
+        # On Python 2, 4 and 8 byte array items come back as longs.
+        # int() turns them back into ints, as randint() would give.
+        result = [int(v) for v in result]
+    return result
+
+class FastBackend(object):
+    """Draws random bits via getrandbits().  With no arguments it uses the
+    random module itself, so random.seed() still makes rolls reproducible.
+
+    getrandbits() costs about the same per bit however many are asked for,
+    so nothing is kept between calls: each call draws exactly what it needs
+    from the generator, and reseeding takes effect on the next roll.
+    Pools smaller than smallQuantity are rolled one getrandbits() call per
+    die, which is cheaper than setting up an array for a handful of dice."""
+    smallQuantity = 8
+
+    def __init__(self, seed=None, generator=None):
+        if generator is not None:
+            self.generator = generator
+        elif seed is not None:
+            self.generator = random.Random(seed)
+        else:
+            self.generator = random
+
+    def _randomBytes(self, numBytes):
+        bits = self.generator.getrandbits(numBytes * 8)
+        return binascii.unhexlify('%0*x' % (numBytes * 2, bits))
+
+    def _fallbackRoll(self, sides):
+        return self.generator.randint(1, sides)
+
+    def rolls(self, quantity, sides):
+        if quantity >= self.smallQuantity or sides == 1:
+            return rollsFromBytes(quantity, sides, self._randomBytes, self._fallbackRoll)
+        getrandbits = self.generator.getrandbits
+        # The fewest bits that can hold sides - 1.  At least half of all
+        # draws are below sides, and those are kept as they are.
+        bits = (sides - 1).bit_length()
+        result = []
+        while len(result) < quantity:
+            v = getrandbits(bits)
+            if v < sides:
+                result.append(int(v) + 1) # getrandbits() gives a long on Python 2.
+        return result
+
+class BufferedBackend(object):
+    """Base class for backends whose source of random bytes is costly to
+    call, so bytes are fetched blockSize at a time and handed out from a
+    buffer.  Subclasses provide _fillBuffer(numBytes), which returns that
+    many fresh random bytes, and _fallbackRoll(sides) for dice too large for
+    rollsFromBytes() to handle.
+
+    The buffer is guarded by a lock, so one instance can safely be shared
+    by several threads, for example as the default backend of a threaded
+    server.  No two rolls are ever made from the same bytes."""
+    blockSize = 4096 # Bytes requested from the underlying source per refill.
+
+    def __init__(self, blockSize=None):
+        if blockSize:
+            self.blockSize = int(blockSize)
+        self._buffer = b''
+        self._pos = 0
+        self._lock = threading.Lock()
+
+    def _take(self, numBytes):
+        """Returns numBytes random bytes, refilling the buffer as needed."""
+        with self._lock:
+            end = self._pos + numBytes
+            if end > len(self._buffer):
+                remainder = self._buffer[self._pos:]
+                needed = numBytes - len(remainder)
+                self._buffer = remainder + self._fillBuffer(max(self.blockSize, needed))
+                self._pos = 0
+                end = numBytes
+            chunk = self._buffer[self._pos:end]
+            self._pos = end
+            return chunk
+
+    def rolls(self, quantity, sides):
+        return rollsFromBytes(quantity, sides, self._take, self._fallbackRoll)
+
+class SecureBackend(BufferedBackend):
+    """Draws bytes in bulk from os.urandom(), the operating system's
+    entropy source.  Can't be seeded."""
+    def _fillBuffer(self, numBytes):
+        return os.urandom(numBytes)
+
+    def _fallbackRoll(self, sides):
+        return random.SystemRandom().randint(1, sides)
+
+class NumpyBackend(BufferedBackend):
+    """Draws bytes in bulk from a NumPy Generator.  Requires NumPy 1.17
+    or newer, which in turn requires Python 3, so this backend can't be
+    used on Python 2."""
+    def __init__(self, seed=None, blockSize=None, generator=None):
+        if numpy is None:
+            raise ImportError('NumpyBackend requires numpy 1.17 or newer.')
+        BufferedBackend.__init__(self, blockSize)
+        if generator is not None:
+            self.generator = generator
+        else:
+            self.generator = numpy.random.default_rng(seed)
+
+    def _fillBuffer(self, numBytes):
+        return self.generator.bytes(numBytes)
+
+    def _fallbackRoll(self, sides):
+        # Generator.integers() is limited to 64 bits, so build the roll
+        # from raw bytes with the same rejection rule as rollsFromBytes().
+        width = (sides.bit_length() + 7) // 8 + 1
+        limit = (256 ** width // sides) * sides
+        while True:
+            v = int(binascii.hexlify(self.generator.bytes(width)), 16)
+            if v < limit:
+                return v % sides + 1
+
+# The backend used whenever one isn't passed in explicitly.
+_defaultBackend = FastBackend()
+
+def getBackend():
+    return _defaultBackend
+
+def setBackend(backend):
+    """Replaces the default backend.  Returns the previous one so callers
+    can restore it."""
+    global _defaultBackend
+    previous = _defaultBackend
+    _defaultBackend = backend
+    return previous
@@ -4,20 +4,24 @@
 
 from __future__ import division
 import math
-import random
+from dicecalc import rng
 
 # NOTE:
 # In other projects tokenAsPrefix is sometimes called nud for null denotation.
 # In other projects tokenAsInfix is sometimes called led for left denotation.
+# rightBindingPower is what tokenAsInfix passes to expression(), and
+# prefixBindingPower is what tokenAsPrefix passes.  validator reads these too.
 
 # A custom error class; exists only to allow raising of errors during parsing.
 class SyntaxError(Exception):
     pass
 
-def roll(quantity, diceVal):
+def roll(quantity, diceVal, backend=None):
     """Accepts two values.  First value is an int representing the number 
     of dice being rolled, the second is an int representing the number 
     of sides these dice have. 
+    An optional rng backend may be passed in; otherwise the default 
+    backend from rng.getBackend() is used.
     Returns a list containing each roll result as an individual value.
     An empty list indicates an error."""
     rolls = []
@@ -30,8 +34,9 @@ def roll(quantity, diceVal):
             for die in range(numRolls):
                 rolls.append(0)
         else:
-            for die in range(numRolls):
-                rolls.append(random.randint(1, numSides))
+            if backend is None:
+                backend = rng.getBackend()
+            rolls = backend.rolls(numRolls, numSides)
         return rolls
     except:
         return rolls
@@ -67,25 +72,28 @@ class literal_token(object):
 
 class operator_add_token(object):
     leftBindingPower = 10
+    rightBindingPower = 10
     def __init__(self, parentToken):
         self.parentToken = parentToken
     def tokenAsInfix(self, left):
-        return left + expression(10)
+        return left + expression(self.rightBindingPower)
 
 class operator_mul_token(object):
     leftBindingPower = 20
+    rightBindingPower = 20
     def __init__(self, parentToken):
         self.parentToken = parentToken
     def tokenAsInfix(self, left):
-        return left * expression(20)
+        return left * expression(self.rightBindingPower)
 
 class operator_div_token(object):
     leftBindingPower = 20
+    rightBindingPower = 20
     def __init__(self, parentToken):
         self.parentToken = parentToken
     def tokenAsInfix(self, left):
         try:
-            return left / expression(20)
+            return left / expression(self.rightBindingPower)
         except ZeroDivisionError:
             self.parentToken['errorType'] = 'badOp'
             self.parentToken['errorMsg'] = 'Cannot divide by zero.'
@@ -93,28 +101,34 @@ class operator_div_token(object):
 
 class operator_pow_token(object):
     leftBindingPower = 30
+    rightBindingPower = leftBindingPower - 1 # Right associative.
     def __init__(self, parentToken):
         self.parentToken = parentToken
     def tokenAsInfix(self, left):
-        return left ** expression(self.leftBindingPower - 1)
+        return left ** expression(self.rightBindingPower)
 
 class operator_sub_token(object):
     leftBindingPower = 10
+    rightBindingPower = 10
+    prefixBindingPower = 25
     def __init__(self, parentToken):
         self.parentToken = parentToken
     def tokenAsPrefix(self):
-        return -expression(25)
+        return -expression(self.prefixBindingPower)
     def tokenAsInfix(self, left):
-        return left - expression(10)
+        return left - expression(self.rightBindingPower)
 
 class operator_dice_token(object):
     leftBindingPower = 100
-    def __init__(self, parentToken, mainRollList):
+    rightBindingPower = 100
+    prefixBindingPower = 100
+    def __init__(self, parentToken, mainRollList, backend=None):
         self.parentToken = parentToken
         self.mainRollList = mainRollList # To add roll results to the main roll list.
+        self.backend = backend # The rng backend to roll with; None for the default.
     def tokenAsPrefix(self):
-        dieSides = expression(100)
-        rollList = roll(1, dieSides)
+        dieSides = expression(self.prefixBindingPower)
+        rollList = roll(1, dieSides, self.backend)
         thisRoll = {
             "sides": dieSides,
             "rolls": rollList,
@@ -127,8 +141,8 @@ class operator_dice_token(object):
         self.mainRollList.append(thisRoll)
         return rollList[0]
     def tokenAsInfix(self, left):
-        dieSides = expression(100)
-        rollList = roll(left, dieSides)
+        dieSides = expression(self.rightBindingPower)
+        rollList = roll(left, dieSides, self.backend)
         rollTotal = sum(rollList)
         thisRoll = {
             "sides": dieSides,
@@ -142,6 +156,7 @@ class operator_dice_token(object):
 
 class operator_lparen_token(object):
     leftBindingPower = 20 # Should match lbp of * & / operators.
+    rightBindingPower = 20 # Applied after the ), as it would be after *.
     def __init__(self, parentToken):
         self.parentToken = parentToken
     def tokenAsPrefix(self):
@@ -152,7 +167,7 @@ class operator_lparen_token(object):
         expr = expression() # Collect the enclosed expression up to next ).
         # Check for higher-precedent infix operators following ) and get the 
         # results of that expression.
-        result = validateClosingTokenAndCreateProxyLiteralToken(operator_rparen_token, ')', self, expr, 20)
+        result = validateClosingTokenAndCreateProxyLiteralToken(operator_rparen_token, ')', self, expr, self.rightBindingPower)
         return left * result # Perform multiplication against result.
 
 class operator_rparen_token(object):
@@ -162,6 +177,11 @@ class operator_rparen_token(object):
 
 class end_token(object):
     leftBindingPower = 0
+    def __init__(self):
+        # A dice expression that ends the whole expression, like the d in
+        # d-2^3, attaches its roll to lastToken, which is then end_token.
+        # The roll is still listed in diceRolls.
+        self.parentToken = {}
 
 # expectedClosingToken is the token class we're looking to consume.
 # expectedClosingTokenStr is a string representing that token.  
@@ -188,7 +208,7 @@ def validateClosingTokenAndCreateProxyLiteralToken(expectedClosingToken=None, ex
 
 # Map tokens to the objects which define their behavior.
 # This creates a generator used to iterator over the tokenList.
-def tokenMapper(tokenList, diceRollsMasterList):
+def tokenMapper(tokenList, diceRollsMasterList, backend=None):
     for t in tokenList:
         if 'errorType' in t:
             raise SyntaxError(t['errorMsg']) # Stop execution and report this token's attached error message.
@@ -211,17 +231,17 @@ def tokenMapper(tokenList, diceRollsMasterList):
             elif operator == ')':
                 yield operator_rparen_token(t)
             elif operator == 'd' or operator == 'D':
-                yield operator_dice_token(t, diceRollsMasterList)
+                yield operator_dice_token(t, diceRollsMasterList, backend)
         else: # This is unlikely to happen.
-            raise SyntaxError('Unknown operator: %s', t['value'])
+            raise SyntaxError('Unknown operator: %s' % t['value'])
     yield end_token()
 
-def parse(tokenized):
+def parse(tokenized, backend=None):
     global token, next
     diceRolls = [] # Will contain the roll dicts.
     error = False
     errorCode = False
-    next = tokenMapper(tokenized['tokenList'], diceRolls).next # A generator
+    next = tokenMapper(tokenized['tokenList'], diceRolls, backend).next # A generator
     try:
         token = next() # Get the first token.
         result = expression() # expression() actually starts the parsing.
@@ -2,21 +2,61 @@
 # Use of this source code is governed by a BSD-style
 # license that can be found in the LICENSE file.
 
-def getChar(expr, i):
-	try:
-		return (expr[i], i)
-	except IndexError: # We've reached the end of the string.
-		return (False, i)
+import re
 
-def buildToken(tokType, value):
+# The expression is split up by a single regular expression, which is much
+# quicker than stepping through it one character at a time.  Each match is
+# any amount of whitespace, meaning characters <= ' ', followed by a token.
+# The token is captured as group 1, and is one of these, tried in order:
+#   A number.  A . or digit, any more digits, then optionally a . followed by
+#   any mix of digits and dots.  So 0.4.3 is collected as one (bad) number
+#   rather than being split into 0.4 and .3, which isn't necessarily correct.
+#   An operator.
+#   A run of unrecognized characters.  The run continues up to the next
+#   operator, digit or . but leaves off any trailing whitespace, so the
+#   token's location covers only the characters that are actually bad.
+#   The token's value still includes that whitespace, as it always has.
+# Trailing whitespace at the end of the expression matches nothing.
+tokenPattern = re.compile(
+	r'[\x00- ]*('
+	r'[0-9.][0-9]*(?:\.[0-9.]*)?'
+	r'|[-+*/^()dD]'
+	r'|[^\x00- +\-*/^()dD.0-9](?:[^+\-*/^()dD.0-9]*[^\x00- +\-*/^()dD.0-9])?'
+	r')'
+)
+
+whitespacePattern = re.compile(r'[\x00- ]*')
+
+opList = ['+', '-', '*', '/', '^', '(', ')', 'd', 'D']
+
+# The errorMsg attached to a token for each errorType.
+errorMessages = {
+	'badNum': 'Unrecognized number',
+	'badChars': 'Unrecognized characters'
+}
+
+# begins and ends are the token's location in the original expression
+# string, ends being exclusive, so exprString[begins:ends] is the token's text.
+def buildToken(tokType, value, begins, ends):
 	return {
 		'tokType': tokType,
-		'value': value
+		'value': value,
+		'begins': begins,
+		'ends': ends
 	}
 
+def parseNumber(collectedString):
+	"""Returns the value of a string matched as a number by tokenPattern,
+	or None if it isn't really a number, like 0.4.3 or a lone ."""
+	try: # Is it an integer?
+		return int(collectedString)
+	except ValueError:
+		try: # Or perhaps a decimal?
+			return float(collectedString)
+		except ValueError: # This is not a number.
+			return None
+
 def tokenize(exprString):
-	opList = ['+', '-', '*', '/', '^', '(', ')', 'd', 'D']
-	collectedString = ""
 	result = []
 	hasError = False # Error canary.
 
@@ -27,91 +67,44 @@ def tokenize(exprString):
 			'hasError': True
 		}
 
-	i = 0 # Current location in string.
-	c = exprString[i] # Currently selected character.
-	while c:
-		 # The begins variable would track the start of each token in the 
-		 # original expression string.  Including begins and i in the 
-		 # returned buildToken object would let the caller know this location, 
-		 # like this: result.append(buildToken('operator', c, begins, i)) 
-		# begins = i
-		if c <= ' ': # This is whitespace; ignore it.
-			c, i = getChar(exprString, i+1) # Get next character.
+	for match in tokenPattern.finditer(exprString):
+		collectedString = match.group(1)
+		begins, ends = match.span(1)
+		c = collectedString[0]
+
+		# Check for operators.
+		if c in opList:
+			# Add this operator to the result array.
+			result.append(buildToken('operator', c, begins, ends))
 
 		# Check for numbers and decimals.
 		elif c == '.' or (c >= '0' and c <= '9'):
-			collectedString = c # Clear any previous value, then store current character.
-			i += 1
-			# Look for additional numbers.
-			while True: 
-				c = getChar(exprString, i)[0]
-				if c < '0' or c > '9':
-					break
-				i += 1
-				collectedString += c
-			# Look for a decimal, and numbers after the decimal.
-			if c == '.':
-				collectedString += c
-				i += 1
-				# Look for additional numbers.
-				while True: 
-					c = getChar(exprString, i)[0]
-					if c != '.' and (c < '0' or c > '9'):
-					# This would work also, but would serve to split 0.4.3 into 
-					# 0.4 and .3, which isn't necessarily correct.
-					# 	if c < '0' or c > '9':
-						break
-					i += 1
-					collectedString += c
-			# Validate that this is a number.
-			try: # Is it an integer?
-				validNum = int(collectedString)
-			except ValueError:
-				try: # Or perhaps a decimal?
-					validNum = float(collectedString)
-				except ValueError: # This is not a number.
-					validNum = None
+			validNum = parseNumber(collectedString)
 			if not validNum is None:
 				#Add this number to the result array.
-				result.append(buildToken('number', validNum))
+				result.append(buildToken('number', validNum, begins, ends))
 			else:
 				hasError = True
 				# Add an error object instead.
-				thisToken = buildToken('number', collectedString)
+				thisToken = buildToken('number', collectedString, begins, ends)
 				thisToken['errorType'] = 'badNum'
-				thisToken['errorMsg'] = 'Unrecognized number'
+				thisToken['errorMsg'] = errorMessages['badNum']
 				result.append(thisToken)
 
-		# Check for operators.
-		elif c in opList:
-			i += 1
-			# Add this operator to the result array.
-			result.append(buildToken('operator', c))
-			c, i = getChar(exprString, i)
-
 		# Currently unrecognized characters.
 		else:
 			hasError = True
-			collectedString = c
-			i += 1
-			# Look for additional unrecognized characters.
-			while True:
-				c = getChar(exprString, i)[0]
-				# This will need to be kept up to date.
-				if not c or (c in opList or (c == '.' or (c >= '0' and c <= '9'))):
-					break
-				i += 1
-				collectedString += c
-			thisToken = buildToken('number', collectedString)
+			# Whitespace up to the next token is part of the value.
+			collectedString += whitespacePattern.match(exprString, ends).group()
+			thisToken = buildToken('number', collectedString, begins, ends)
 			thisToken['errorType'] = 'badChars'
-			thisToken['errorMsg'] = 'Unrecognized characters'
+			thisToken['errorMsg'] = errorMessages['badChars']
 			result.append(thisToken)
 
-	# Return the array of collected tokens, the original expression and 
+	# Return the array of collected tokens, the original expression and
 	# the error canary.  The error canary isn't currently being used.
 	return {
 		'tokenList': result,
 		'origString': exprString,
 		'hasError': hasError
 	}
-
@@ -0,0 +1,231 @@
+# Copyright 2019 Telharmonium. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+from dicecalc import tdop, tokenizer
+
+# NOTE:
+# validate() walks an expression the way tdop.expression() does, but only
+# notes where parsing stops and which token, if any, tdop would flag.
+# Nothing is rolled or calculated, and no token dicts or token objects are
+# built, so it's cheap enough to call on every keystroke.
+#
+# Tokens are represented by their kind alone: the operator character ('D'
+# becomes 'd'), 'number', or for anything the tokenizer would flag, the
+# errorType it would give.
+# Every binding power comes from the tdop token classes, and errors are
+# raised where tdop raises them, so an expression passes validation if and
+# only if tdop can parse it.  The only errors validation can't see are those
+# that depend on computed values, such as dividing by zero.
+# Validator mirrors the control flow of tdop.expression() and the token
+# classes' tokenAsPrefix/tokenAsInfix, so a change to either needs the same
+# change here.  ValidateCase.test_parity in run-tests.py checks the two
+# against each other.
+
+leftBindingPowers = {
+    '+': tdop.operator_add_token.leftBindingPower,
+    '-': tdop.operator_sub_token.leftBindingPower,
+    '*': tdop.operator_mul_token.leftBindingPower,
+    '/': tdop.operator_div_token.leftBindingPower,
+    '^': tdop.operator_pow_token.leftBindingPower,
+    'd': tdop.operator_dice_token.leftBindingPower,
+    '(': tdop.operator_lparen_token.leftBindingPower,
+    ')': tdop.operator_rparen_token.leftBindingPower,
+    'end': tdop.end_token.leftBindingPower
+}
+
+rightBindingPowers = {
+    '+': tdop.operator_add_token.rightBindingPower,
+    '-': tdop.operator_sub_token.rightBindingPower,
+    '*': tdop.operator_mul_token.rightBindingPower,
+    '/': tdop.operator_div_token.rightBindingPower,
+    '^': tdop.operator_pow_token.rightBindingPower,
+    'd': tdop.operator_dice_token.rightBindingPower,
+    '(': tdop.operator_lparen_token.rightBindingPower
+}
+
+operatorKinds = {
+    '+': '+',
+    '-': '-',
+    '*': '*',
+    '/': '/',
+    '^': '^',
+    '(': '(',
+    ')': ')',
+    'd': 'd',
+    'D': 'd'
+}
+
+# Kinds that stop tdop's next() with an error.  'pastEnd' follows 'end',
+# for an expression that ends too soon.
+haltingKinds = dict(tokenizer.errorMessages, pastEnd="Unexpected end of expression")
+
+class Validator(object):
+    def __init__(self, kinds):
+        self.kinds = kinds # Token kinds, followed by 'end' and 'pastEnd'.
+        self.index = -1 # Index of the current token.
+        self.kind = None # Kind of the current token.
+        self.lastIndex = None # Index of tdop's lastToken.
+        self.errorIndex = False # Index of the token tdop would flag.
+        self.errorMsg = False
+
+    def advance(self):
+        # Equivalent to tdop's next().  After the proxy literal created by
+        # a ( used as infix, this continues from the token after the ).
+        self.index += 1
+        self.kind = kind = self.kinds[self.index]
+        if kind in haltingKinds:
+            if kind != 'pastEnd':
+                self.errorIndex = self.index
+                self.errorMsg = haltingKinds[kind]
+            raise tdop.SyntaxError(haltingKinds[kind])
+
+    def unexpected(self):
+        # Where tdop.expression() catches an AttributeError.
+        self.errorIndex = self.lastIndex
+        self.errorMsg = 'Unexpected value'
+        raise tdop.SyntaxError("Unexpected value in expression")
+
+    def expectClosingParen(self, callingIndex):
+        if self.kind != ')':
+            self.errorIndex = callingIndex
+            self.errorMsg = 'Missing )'
+            raise tdop.SyntaxError('Expected )')
+
+    def expression(self, rightBindingPower=0):
+        self.lastIndex = curIndex = self.index
+        curKind = self.kind
+        self.advance()
+        self.prefix(curIndex, curKind)
+        leftBindingPower = leftBindingPowers.get(self.kind)
+        while leftBindingPower is not None and rightBindingPower < leftBindingPower:
+            curIndex = self.index
+            curKind = self.kind
+            self.advance()
+            self.infix(curIndex, curKind)
+            self.lastIndex = self.index
+            leftBindingPower = leftBindingPowers.get(self.kind)
+        if leftBindingPower is None: # Numbers have no leftBindingPower.
+            self.unexpected()
+
+    def prefix(self, index, kind):
+        if kind == 'number' or kind == 'proxy':
+            pass
+        elif kind == '-':
+            self.expression(tdop.operator_sub_token.prefixBindingPower)
+        elif kind == 'd':
+            self.expression(tdop.operator_dice_token.prefixBindingPower)
+        elif kind == '(':
+            self.expression()
+            self.expectClosingParen(index)
+            self.advance()
+        else:
+            self.unexpected()
+
+    def infix(self, index, kind):
+        if kind == '(':
+            self.expression()
+            self.expectClosingParen(index)
+            # tdop replaces the ) with a proxy literal holding the value of
+            # the parentheses, and carries on from there.
+            self.kind = 'proxy'
+            self.expression(rightBindingPowers['('])
+        else:
+            self.expression(rightBindingPowers[kind])
+
+def tokenSpans(exprString):
+    """Returns (begins, ends) for each token tokenizer.tokenize() would
+    return."""
+    return [match.span(1) for match in tokenizer.tokenPattern.finditer(exprString)]
+
+def buildError(spans, origString, index, errorMsg):
+    if index is False: # The expression ended early; point at its end.
+        begins = ends = len(origString)
+    else:
+        begins, ends = spans[index]
+    return {
+        "token": index,
+        "begins": begins,
+        "ends": ends,
+        "errorMsg": errorMsg
+    }
+
+def validate(exprString):
+    """Accepts an expression string.
+    Returns a dict with the error and errorCode that tdop.parse() would
+    return for the same expression, a list of errors, and the canonical form
+    of the expression.  Each error gives the index of the token in the
+    tokenizer's tokenList, or False if the expression ended early, along
+    with the token's location in the original string.  Every token the
+    tokenizer flags is listed, even those tdop would never reach.
+    The canonical form has no whitespace, d in place of D, and * wherever
+    multiplication was implied.  Tokens after the end of the expression,
+    which tdop ignores, are dropped."""
+    kinds = []
+    texts = [] # Canonical text of each token.
+    hasBadTokens = False
+    kind = None
+    # The same scan tokenizer.tokenize() makes, without building token dicts.
+    for text in tokenizer.tokenPattern.findall(exprString):
+        if text in operatorKinds:
+            if text == '(' and (kind == 'number' or kind == ')'):
+                # tdop reads this ( as implied multiplication, which is made
+                # explicit.  The lbp of ( is that of *, so this doesn't change
+                # the order of operations.
+                texts.append('*(')
+            else:
+                texts.append(operatorKinds[text])
+            kind = operatorKinds[text]
+        elif text[0] == '.' or (text[0] >= '0' and text[0] <= '9'):
+            # Anything matched as a number is one unless it's a lone . or
+            # has a second ., the same test tokenizer.parseNumber() makes.
+            if text == '.' or text.count('.') > 1:
+                hasBadTokens = True
+                kind = 'badNum'
+            else:
+                kind = 'number'
+            texts.append(text) # Numbers are kept as written.
+        else:
+            hasBadTokens = True
+            kind = 'badChars'
+            texts.append(text)
+        kinds.append(kind)
+    kinds.append('end')
+    kinds.append('pastEnd')
+
+    validator = Validator(kinds)
+    error = False
+    errorCode = False
+    canonical = False
+    try:
+        validator.advance()
+        validator.expression()
+        # Parsing stops at the end, or at a stray ); tdop ignores the rest.
+        canonical = ''.join(texts[:validator.index])
+    except tdop.SyntaxError, e:
+        error = True
+        errorCode = str(e)
+    except RuntimeError:
+        # RuntimeError is Python's recursion limit, reached by very deeply
+        # nested input like a held down (.  tdop runs into it too, and its
+        # catch-all reports it as this.
+        error = True
+        errorCode = "Unable to parse expression."
+
+    errors = []
+    if error or hasBadTokens:
+        # Only now are token locations needed.
+        spans = tokenSpans(exprString)
+        for index, kind in enumerate(kinds):
+            if kind in tokenizer.errorMessages:
+                errors.append(buildError(spans, exprString, index, tokenizer.errorMessages[kind]))
+        # Add the error raised while parsing, unless the tokenizer already flagged that token.
+        if error and (validator.errorIndex is False or not kinds[validator.errorIndex] in tokenizer.errorMessages):
+            errors.append(buildError(spans, exprString, validator.errorIndex, validator.errorMsg or errorCode))
+    return {
+        "error": error,
+        "errorCode": errorCode,
+        "errors": errors,
+        "canonical": canonical,
+        "origString": exprString
+    }
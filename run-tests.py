@@ -2,6 +2,7 @@
 # Use of this source code is governed by a BSD-style
 # license that can be found in the LICENSE file.
 
+import random
 import unittest
 import dicecalc
 
@@ -288,6 +289,228 @@ class ExpressionsCase(unittest.TestCase):
     # in this case?  Maybe as a reaction to raising an error?  Or perhaps not.
     # print parse('(1 + 9)2')
 
+class TokenizerCase(unittest.TestCase):
+    """Pin tokenize() output to what the original character-by-character
+    tokenizer returned, plus each token's location."""
+
+    # (expression, [(tokType, value, errorType, begins, ends), ...])
+    tokenizedList = [
+        ('3 pencil 4', [
+            ('number', 3, None, 0, 1),
+            # The value keeps the whitespace after bad characters; the location doesn't.
+            ('number', 'pencil ', 'badChars', 2, 8),
+            ('number', 4, None, 9, 10)]),
+        ('5.2 + .6.3 + 0.4.3', [
+            ('number', 5.2, None, 0, 3),
+            ('operator', '+', None, 4, 5),
+            ('number', '.6.3', 'badNum', 6, 10),
+            ('operator', '+', None, 11, 12),
+            ('number', '0.4.3', 'badNum', 13, 18)]),
+        (' 3D(4.5)+ .6.3x', [
+            ('number', 3, None, 1, 2),
+            ('operator', 'D', None, 2, 3),
+            ('operator', '(', None, 3, 4),
+            ('number', 4.5, None, 4, 7),
+            ('operator', ')', None, 7, 8),
+            ('operator', '+', None, 8, 9),
+            ('number', '.6.3', 'badNum', 10, 14),
+            ('number', 'x', 'badChars', 14, 15)]),
+        ('2 * pencil  ', [
+            ('number', 2, None, 0, 1),
+            ('operator', '*', None, 2, 3),
+            ('number', 'pencil  ', 'badChars', 4, 10)]),
+        ('a b (c)', [
+            ('number', 'a b ', 'badChars', 0, 3),
+            ('operator', '(', None, 4, 5),
+            ('number', 'c', 'badChars', 5, 6),
+            ('operator', ')', None, 6, 7)])
+    ]
+
+    def test_tokenize(self):
+        for expr, expected in self.tokenizedList:
+            tokenized = dicecalc.tokenizer.tokenize(expr)
+            tokens = [(t['tokType'], t['value'], t.get('errorType'), t['begins'], t['ends']) for t in tokenized['tokenList']]
+            self.assertEqual(tokens, expected)
+            self.assertEqual(tokenized['hasError'], any(t[2] for t in expected))
+        self.assertEqual(dicecalc.tokenizer.tokenize('')['tokenList'], [])
+
+class RngCase(unittest.TestCase):
+    """Test the rng backends."""
+
+    def backends(self):
+        backends = [dicecalc.rng.FastBackend(), dicecalc.rng.SecureBackend()]
+        try:
+            backends.append(dicecalc.rng.NumpyBackend())
+        except ImportError:
+            pass
+        return backends
+
+    def test_rolls_in_range(self):
+        # A small block size forces plenty of refills mid-roll.  Small pools
+        # take a different path through FastBackend than large ones.
+        for sides in [1, 2, 6, 20, 255, 256, 257, 65537, 2 ** 40, 2 ** 70]:
+            for backend in self.backends() + [dicecalc.rng.SecureBackend(blockSize=7)]:
+                rolls = backend.rolls(3, sides) + backend.rolls(500, sides)
+                self.assertEqual(len(rolls), 503)
+                for r in rolls:
+                    self.assertTrue(1 <= r and r <= sides)
+                    # Plain ints where they fit, as randint() gives.
+                    self.assertEqual(type(r), type(int(r)))
+
+    def test_all_faces_appear(self):
+        for backend in self.backends():
+            self.assertEqual(set(backend.rolls(1000, 6)), set(range(1, 7)))
+
+    def test_seeded_backend_is_reproducible(self):
+        first = dicecalc.rng.FastBackend(seed=42).rolls(50, 20)
+        second = dicecalc.rng.FastBackend(seed=42).rolls(50, 20)
+        self.assertEqual(first, second)
+
+    def test_random_seed_with_default_backend(self):
+        # Small pools and large pools take different paths; check both.
+        expressions = ['3d6', 'd20', '50d6', '3d6']
+        random.seed(1)
+        first = [dicecalc.calc(e)['diceRolls'] for e in expressions]
+        random.seed(1)
+        second = [dicecalc.calc(e)['diceRolls'] for e in expressions]
+        self.assertEqual(first, second)
+
+    def test_calc_uses_backend(self):
+        class MaxBackend(object):
+            def rolls(self, quantity, sides):
+                return [sides] * quantity
+        self.assertEqual(dicecalc.calc('3d6 + d4', MaxBackend())['result'], 22)
+        previous = dicecalc.rng.setBackend(MaxBackend())
+        try:
+            self.assertEqual(dicecalc.calc('2d10')['result'], 20)
+        finally:
+            dicecalc.rng.setBackend(previous)
+
+class ValidateCase(unittest.TestCase):
+    """Test validation against the results of actually parsing."""
+
+    canonicalList = [
+        (' 2 D 20 + 3 ', '2d20+3'),
+        ('2d4(3d2)', '2d4*(3d2)'),
+        ('3(4+5)^2', '3*(4+5)^2'),
+        ('-2(-.3)', '-2*(-.3)'),
+        ('(2)(3)(4)', '(2)*(3)*(4)'),
+        # tdop ignores anything after a stray ).
+        ('2 + 2)', '2+2'),
+        # A roll that ends the expression, which tdop once failed to parse.
+        ('d-2^3)', 'd-2^3'),
+        # Huge dice pools cost nothing, since nothing is rolled.
+        ('4000000000000d200000', '4000000000000d200000')
+    ]
+
+    def test_basic_expressions(self):
+        for testExpression in ExpressionsCase.basicExpressionsList:
+            result = dicecalc.validate(testExpression[0])
+            self.assertFalse(result['error'])
+            self.assertEqual(result['errors'], [])
+            # The canonical form must calculate to the same result.
+            self.assertEqual(dicecalc.calc(result['canonical'])['result'], testExpression[1])
+
+    def test_error_expressions(self):
+        for errorExpression in ExpressionsCase.errorExpressionsList:
+            result = dicecalc.validate(errorExpression[0])
+            self.assertTrue(result['error'])
+            self.assertEqual(result['errorCode'], errorExpression[1])
+            if errorExpression[2]:
+                errorTokens = [e['token'] for e in result['errors']]
+                self.assertTrue(errorExpression[2] in errorTokens)
+                for e in result['errors']:
+                    if e['token'] == errorExpression[2]:
+                        self.assertEqual(e['errorMsg'], errorExpression[3])
+
+    def test_error_positions(self):
+        result = dicecalc.validate('2 * pencil')
+        self.assertEqual(result['errors'], [{'token': 2, 'begins': 4, 'ends': 10, 'errorMsg': 'Unrecognized characters'}])
+        # Whitespace after bad characters isn't part of the error.
+        result = dicecalc.validate('3 pencil 4')
+        self.assertEqual(result['errors'], [{'token': 1, 'begins': 2, 'ends': 8, 'errorMsg': 'Unrecognized characters'}])
+        result = dicecalc.validate('(2 * 5 7')
+        self.assertEqual(result['errors'], [{'token': 3, 'begins': 5, 'ends': 6, 'errorMsg': 'Unexpected value'}])
+        result = dicecalc.validate('2 *')
+        self.assertEqual(result['errors'], [{'token': False, 'begins': 3, 'ends': 3, 'errorMsg': 'Unexpected end of expression'}])
+        result = dicecalc.validate('')
+        self.assertEqual(result['errorCode'], 'Unexpected end of expression')
+
+    def test_deep_nesting(self):
+        # Deep enough to reach the recursion limit in both parsers.
+        for expr in ['(' * 600 + '1' + ')' * 600, '-' * 1200 + '1', '2^' * 700 + '2']:
+            result = dicecalc.validate(expr)
+            self.assertTrue(result['error'])
+            self.assertEqual(result['errorCode'], dicecalc.calc(expr)['errorCode'])
+
+    def test_canonical(self):
+        for expr, canonical in self.canonicalList:
+            self.assertEqual(dicecalc.validate(expr)['canonical'], canonical)
+
+    def randomTokens(self, generator, depth=0):
+        """A random expression that tdop can parse, as a list of tokens."""
+        choice = generator.randint(0, 5) if depth < 3 else 0
+        if choice == 0:
+            return [generator.choice(['2', '3'])]
+        elif choice == 1:
+            return [generator.choice(['-', 'd', 'D'])] + self.randomTokens(generator, depth + 1)
+        elif choice == 2:
+            return ['('] + self.randomTokens(generator, depth + 1) + [')']
+        elif choice == 3:
+            return self.randomTokens(generator, depth + 1) + ['('] + self.randomTokens(generator, depth + 1) + [')']
+        else:
+            return self.randomTokens(generator, depth + 1) + [generator.choice('+-*^dD')] + self.randomTokens(generator, depth + 1)
+
+    def parityCorpus(self, count):
+        """Random expressions, about half of them broken, whose calc() can
+        only fail for structural reasons.  / is left out so nothing divides
+        by zero, and there's at most one ^, never followed by - or (, so no
+        result can overflow or take a root of a negative number."""
+        pieces = ['2', '3', '+', '-', '*', '^', 'd', 'D', '(', ')', 'x', '.2.']
+        generator = random.Random(2019)
+        corpus = []
+        while len(corpus) < count:
+            tokens = self.randomTokens(generator)
+            for i in range(generator.randint(0, 2)): # Break it a little.
+                position = generator.randint(0, len(tokens))
+                if generator.random() < 0.5:
+                    del tokens[position:position + 1]
+                else:
+                    tokens.insert(position, generator.choice(pieces))
+            expr = ''
+            for token in tokens:
+                if token in '23' and expr[-1:] in '23' or generator.random() < 0.2:
+                    expr += ' ' # Numbers side by side would become one big number.
+                expr += token
+            compact = expr.replace(' ', '')
+            if compact.count('^') > 1 or '^-' in compact or '^(' in compact:
+                continue
+            corpus.append(expr)
+        return corpus
+
+    def test_parity(self):
+        # validate() mirrors tdop's parser, so check that the two agree.
+        class MinBackend(object):
+            def rolls(self, quantity, sides):
+                return [1] * quantity
+        backend = MinBackend()
+        for expr in self.parityCorpus(2000):
+            result = dicecalc.validate(expr)
+            calculated = dicecalc.calc(expr, backend)
+            self.assertEqual((result['error'], result['errorCode']), (calculated['error'], calculated['errorCode']), expr)
+            if not result['error']:
+                self.assertEqual(dicecalc.calc(result['canonical'], backend)['result'], calculated['result'], expr)
+
+    def test_nothing_rolled(self):
+        class FailingBackend(object):
+            def rolls(self, quantity, sides):
+                raise AssertionError('validate() rolled dice')
+        previous = dicecalc.rng.setBackend(FailingBackend())
+        try:
+            self.assertFalse(dicecalc.validate('3d6 + d(2d4)')['error'])
+        finally:
+            dicecalc.rng.setBackend(previous)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file